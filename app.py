@@ -1,7 +1,16 @@
 import streamlit as st
 import requests
+import orjson
 import pandas as pd
+import numpy as np
 import os
+import json
+import re
+import functools
+import hashlib
+import time
+import tempfile
+from pathlib import Path
 from dotenv import load_dotenv
 
 # ----------------------------
@@ -13,11 +22,28 @@ load_dotenv()
 MONDAY_API_KEY = os.getenv("MONDAY_API_KEY")
 DEALS_BOARD_ID = os.getenv("DEALS_BOARD_ID")
 WORK_ORDERS_BOARD_ID = os.getenv("WORK_ORDERS_BOARD_ID")
-HF_API_KEY = os.getenv("HF_API_KEY")
 
-HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.1"
+# Comma-separated monday.com column ids to fetch per board (all columns if unset)
+DEALS_COLUMN_IDS = tuple(filter(None, os.getenv("DEALS_COLUMN_IDS", "").split(",")))
+WORK_ORDERS_COLUMN_IDS = tuple(filter(None, os.getenv("WORK_ORDERS_COLUMN_IDS", "").split(",")))
+
 MONDAY_URL = "https://api.monday.com/v2"
 
+# Parsed boards are kept on disk between Streamlit processes
+CACHE_DIR = Path(".cache")
+CACHE_TTL = 300
+
+# Column lookup keywords, in priority order
+DEAL_STATUS_KEYWORDS = ("deal status", "status")
+STATUS_KEYWORDS = ("status",)
+VALUE_KEYWORDS = ("value", "amount")
+PROBABILITY_KEYWORDS = ("probability",)
+SECTOR_KEYWORDS = ("sector",)
+NUMERIC_KEYWORDS = ("value", "amount", "probability")
+
+# Low-cardinality columns that are filtered and grouped on repeatedly
+CATEGORICAL_COLUMNS = ("Deal Status", "Status", "Sector/service")
+
 st.set_page_config(page_title="Monday BI Agent", layout="wide")
 st.title("📊 Monday.com Business Intelligence Agent")
 st.markdown("Founder-level AI business intelligence across Sales & Operations")
@@ -26,15 +52,94 @@ st.markdown("Founder-level AI business intelligence across Sales & Operations")
 # FETCH BOARD DATA
 # ----------------------------
 
-def fetch_board(board_id):
+@st.cache_resource
+def monday_session():
+    # One pooled connection per server process, shared across reruns and sessions
+    session = requests.Session()
+    session.headers.update({"Authorization": MONDAY_API_KEY})
+    return session
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_boards(boards):
+
+    frames = {}
+    missing = []
+
+    for board_id, column_ids in boards:
+        df = read_cached_board(cache_path(board_id, column_ids))
+        if df is not None:
+            frames[board_id] = df
+        else:
+            missing.append((board_id, column_ids))
+
+    if missing:
+        query = "{" + "".join(
+            board_query(f"board_{i}", board_id, column_ids)
+            for i, (board_id, column_ids) in enumerate(missing)
+        ) + "}"
+
+        response = monday_session().post(MONDAY_URL, json={"query": query}, timeout=15)
+
+        if response.status_code != 200:
+            raise Exception("Failed to fetch board")
+
+        data = orjson.loads(response.content)
+
+        for i, (board_id, column_ids) in enumerate(missing):
+            items = data["data"][f"board_{i}"][0]["items_page"]["items"]
+            df = items_to_frame(items)
+            frames[board_id] = df
+            write_cached_board(df, cache_path(board_id, column_ids))
+
+    return [
+        clean_categorical_columns(clean_numeric_columns(frames[board_id]))
+        for board_id, _ in boards
+    ]
+
+
+def cache_path(board_id, column_ids):
+    # Key on the column selection too, so changing *_COLUMN_IDS invalidates the file
+    columns_key = hashlib.sha1(",".join(column_ids).encode()).hexdigest()[:12]
+    return CACHE_DIR / f"board_{board_id}_{columns_key}.parquet"
+
+
+def read_cached_board(path):
+
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL:
+            return pd.read_parquet(path)
+    except Exception:
+        # Missing, truncated or unreadable files are treated as a cache miss
+        pass
+
+    return None
 
-    query = f"""
-    {{
-      boards(ids: {board_id}) {{
+
+def write_cached_board(df, path):
+
+    tmp_path = None
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def board_query(alias, board_id, column_ids):
+
+    column_filter = f"(ids: {json.dumps(list(column_ids))})" if column_ids else ""
+
+    return f"""
+      {alias}: boards(ids: {board_id}) {{
         items_page(limit: 500) {{
           items {{
             name
-            column_values {{
+            column_values{column_filter} {{
               text
               column {{
                 title
@@ -43,43 +148,68 @@ def fetch_board(board_id):
           }}
         }}
       }}
-    }}
     """
 
-    headers = {"Authorization": MONDAY_API_KEY}
-    response = requests.post(MONDAY_URL, json={"query": query}, headers=headers)
-
-    if response.status_code != 200:
-        raise Exception("Failed to fetch board")
 
-    data = response.json()
-    items = data["data"]["boards"][0]["items_page"]["items"]
+def items_to_frame(items):
 
-    rows = []
-    for item in items:
-        row = {"Item Name": item["name"]}
+    names, idx, cols, texts = [], [], [], []
+    for i, item in enumerate(items):
+        names.append(item["name"])
         for col in item["column_values"]:
-            row[col["column"]["title"]] = col["text"]
-        rows.append(row)
+            idx.append(i)
+            cols.append(col["column"]["title"])
+            texts.append(col["text"])
+
+    long = pd.DataFrame({"i": idx, "c": cols, "t": texts})
+    wide = (
+        long.drop_duplicates(["i", "c"], keep="last")
+        .pivot(index="i", columns="c", values="t")
+        .reindex(index=range(len(names)), columns=pd.unique(long["c"]))
+    )
+    wide.columns.name = None
+    wide.insert(0, "Item Name", names)
 
-    return pd.DataFrame(rows)
+    return wide.reset_index(drop=True)
 
 # ----------------------------
 # UTILITIES
 # ----------------------------
 
-def find_column(df, keywords):
+@functools.lru_cache(maxsize=64)
+def _column_index(columns):
+    return tuple((col, col.lower()) for col in columns)
+
+
+@functools.lru_cache(maxsize=256)
+def _find_column_cached(columns, keywords):
+    index = _column_index(columns)
     for keyword in keywords:
-        for col in df.columns:
-            if keyword.lower() in col.lower():
+        keyword = keyword.lower()
+        for col, lowered in index:
+            if keyword in lowered:
                 return col
     return None
 
 
+def find_column(df, keywords):
+    return _find_column_cached(tuple(df.columns), tuple(keywords))
+
+
 def clean_numeric_columns(df):
-    for col in df.columns:
-        if any(word in col.lower() for word in ["value", "amount", "probability"]):
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    matched = [
+        col for col, lowered in _column_index(tuple(df.columns))
+        if any(word in lowered for word in NUMERIC_KEYWORDS)
+    ]
+    if matched:
+        df[matched] = df[matched].apply(pd.to_numeric, errors="coerce")
+    return df
+
+
+def clean_categorical_columns(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
     return df
 
 # ----------------------------
@@ -88,22 +218,21 @@ def clean_numeric_columns(df):
 
 def calculate_pipeline(df):
 
-    status_col = find_column(df, ["deal status", "status"])
-    value_col = find_column(df, ["value", "amount"])
-    prob_col = find_column(df, ["probability"])
+    status_col = find_column(df, DEAL_STATUS_KEYWORDS)
+    value_col = find_column(df, VALUE_KEYWORDS)
+    prob_col = find_column(df, PROBABILITY_KEYWORDS)
 
     if not status_col or not value_col:
         return 0, 0
 
-    open_deals = df[df[status_col] != "Closed Won"]
+    open_mask = (df[status_col] != "Closed Won").to_numpy()
+    values = df[value_col].to_numpy(dtype=float)[open_mask]
 
-    total_pipeline = pd.to_numeric(open_deals[value_col], errors="coerce").sum()
+    total_pipeline = np.nansum(values)
 
     if prob_col:
-        weighted_pipeline = (
-            pd.to_numeric(open_deals[value_col], errors="coerce")
-            * pd.to_numeric(open_deals[prob_col], errors="coerce")
-        ).sum()
+        probabilities = df[prob_col].to_numpy(dtype=float)[open_mask]
+        weighted_pipeline = np.nansum(values * probabilities)
     else:
         weighted_pipeline = total_pipeline
 
@@ -112,9 +241,9 @@ def calculate_pipeline(df):
 
 def revenue_by_sector(df):
 
-    status_col = find_column(df, ["deal status", "status"])
-    value_col = find_column(df, ["value", "amount"])
-    sector_col = find_column(df, ["sector"])
+    status_col = find_column(df, DEAL_STATUS_KEYWORDS)
+    value_col = find_column(df, VALUE_KEYWORDS)
+    sector_col = find_column(df, SECTOR_KEYWORDS)
 
     if not status_col or not value_col:
         return pd.Series()
@@ -123,8 +252,8 @@ def revenue_by_sector(df):
 
     if sector_col:
         return (
-            closed.groupby(sector_col)[value_col]
-            .apply(lambda x: pd.to_numeric(x, errors="coerce").sum())
+            closed.groupby(sector_col, observed=True)[value_col]
+            .sum()
             .sort_values(ascending=False)
         )
 
@@ -136,7 +265,7 @@ def revenue_by_sector(df):
 
 def work_order_metrics(df):
 
-    status_col = find_column(df, ["status"])
+    status_col = find_column(df, STATUS_KEYWORDS)
     total_orders = len(df)
 
     if not status_col:
@@ -154,12 +283,14 @@ def work_order_metrics(df):
 # DASHBOARD
 # ----------------------------
 
+@st.fragment
 def build_dashboard(deals_df, work_df):
 
     st.subheader("📈 Executive Dashboard")
 
     pipeline, weighted = calculate_pipeline(deals_df)
-    revenue = revenue_by_sector(deals_df).sum()
+    sector_data = revenue_by_sector(deals_df)
+    revenue = sector_data.sum()
 
     total_orders, completed, in_progress, delayed = work_order_metrics(work_df)
 
@@ -170,104 +301,41 @@ def build_dashboard(deals_df, work_df):
     col3.metric("Closed Revenue", f"₹{revenue:,.0f}")
     col4.metric("Work Orders", total_orders)
 
-    sector_data = revenue_by_sector(deals_df)
     if not sector_data.empty:
         st.subheader("Revenue by Sector")
         st.bar_chart(sector_data)
 
 # ----------------------------
-# HUGGINGFACE INTELLIGENCE
+# INTENT CLASSIFICATION
 # ----------------------------
 
-def interpret_query(query):
-
-    if not HF_API_KEY:
-        return rule_based_intent(query)
-
-    headers = {
-        "Authorization": f"Bearer {HF_API_KEY}",
-        "Content-Type": "application/json"
-    }
+INTENT_RE = re.compile(
+    r"(?P<pipeline>pipeline|forecast)"
+    r"|(?P<revenue>revenue)"
+    r"|(?P<operations>operation|work order)"
+    r"|(?P<leadership>leadership|summary)"
+    r"|(?P<sector>sector)",
+    re.IGNORECASE,
+)
+INTENT_NAMES = ("pipeline", "revenue", "operations", "leadership", "sector")
 
-    prompt = f"""
-    Classify this business query into one word only:
-    pipeline, revenue, operations, leadership, sector, general
 
-    Query: {query}
-    """
-
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "max_new_tokens": 10,
-            "temperature": 0.1
-        }
-    }
-
-    try:
-        response = requests.post(
-            f"https://api-inference.huggingface.co/models/{HF_MODEL}",
-            headers=headers,
-            json=payload,
-            timeout=15
-        )
-
-        if response.status_code != 200:
-            return rule_based_intent(query)
-
-        result = response.json()
+def interpret_query(query):
 
-        if isinstance(result, list) and "generated_text" in result[0]:
-            output = result[0]["generated_text"].lower()
-            for intent in ["pipeline", "revenue", "operations", "leadership", "sector"]:
-                if intent in output:
-                    return intent
+    matched = {m.lastgroup for m in INTENT_RE.finditer(query)}
 
-    except:
-        return rule_based_intent(query)
+    for intent in INTENT_NAMES:
+        if intent in matched:
+            return intent
 
     return "general"
 
-
-# ----------------------------
-# FALLBACK RULE ENGINE
-# ----------------------------
-
-def rule_based_intent(query):
-
-    q = query.lower()
-
-    if "pipeline" in q or "forecast" in q:
-        return "pipeline"
-    elif "revenue" in q:
-        return "revenue"
-    elif "operation" in q or "work order" in q:
-        return "operations"
-    elif "leadership" in q or "summary" in q:
-        return "leadership"
-    elif "sector" in q:
-        return "sector"
-    else:
-        return "general"
-
 # ----------------------------
-# MAIN FLOW
+# CHAT MODE
 # ----------------------------
 
-try:
-    with st.spinner("Fetching live data from monday.com..."):
-        deals_df = clean_numeric_columns(fetch_board(DEALS_BOARD_ID))
-        work_df = clean_numeric_columns(fetch_board(WORK_ORDERS_BOARD_ID))
-except Exception:
-    st.error("⚠ Unable to fetch monday.com data.")
-    st.stop()
-
-tab1, tab2 = st.tabs(["📊 Dashboard", "🤖 Chat Mode"])
-
-with tab1:
-    build_dashboard(deals_df, work_df)
-
-with tab2:
+@st.fragment
+def build_chat(deals_df, work_df):
 
     query = st.text_input("Ask a business question:")
 
@@ -307,3 +375,25 @@ with tab2:
 
         else:
             st.write("Could you clarify your request?")
+
+# ----------------------------
+# MAIN FLOW
+# ----------------------------
+
+try:
+    with st.spinner("Fetching live data from monday.com..."):
+        deals_df, work_df = fetch_boards((
+            (DEALS_BOARD_ID, DEALS_COLUMN_IDS),
+            (WORK_ORDERS_BOARD_ID, WORK_ORDERS_COLUMN_IDS),
+        ))
+except Exception:
+    st.error("⚠ Unable to fetch monday.com data.")
+    st.stop()
+
+tab1, tab2 = st.tabs(["📊 Dashboard", "🤖 Chat Mode"])
+
+with tab1:
+    build_dashboard(deals_df, work_df)
+
+with tab2:
+    build_chat(deals_df, work_df)